@@ -1,13 +1,60 @@
+import csv
+import functools
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 import click
 import json
 
+from planningcenter_toolkit._row import build_row
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# On-disk HTTP cache for the idempotent read endpoints; optional so the
+# tool still works without requests-cache installed
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+# Only advertise brotli when the decoder is importable; urllib3 needs it
+# to transparently decompress br-encoded responses
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
+
+# Prefer the libyaml C loader when PyYAML was built against it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 # Default path to the YAML configuration file
 DEFAULT_CONFIG_PATH = os.path.expanduser("~/.planningcenter_toolkit/pat.yaml")
 
+@functools.lru_cache(maxsize=8)
+def _load_auth_cached(config_path, stat_key):
+    """
+    Parse the YAML config, memoized by path plus (mtime, size) so the key
+    invalidates itself whenever the file changes.
+    """
+    with open(config_path, "r") as file:
+        config = yaml.load(file, Loader=_YamlLoader)
+
+    return config.get("client_id"), config.get("client_secret")
+
+
 def load_authentication(config_path):
     """
     Load authentication credentials from the specified YAML file.
@@ -15,11 +62,8 @@ def load_authentication(config_path):
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Configuration file not found at {config_path}. Please create it.")
 
-    with open(config_path, "r") as file:
-        config = yaml.safe_load(file)
-
-    client_id = config.get("client_id")
-    client_secret = config.get("client_secret")
+    stat = os.stat(config_path)
+    client_id, client_secret = _load_auth_cached(config_path, (stat.st_mtime, stat.st_size))
 
     if not client_id or not client_secret:
         raise ValueError("The YAML file must contain both 'client_id' and 'client_secret'.")
@@ -27,116 +71,109 @@ def load_authentication(config_path):
     return client_id, client_secret
 
 
-def fetch_people(client_id, client_secret, limit):
+def _session(auth, cached=True):
+    """
+    Build a requests.Session with connection pooling and retries.
+
+    Reusing one session keeps the TCP+TLS connection alive across
+    paginated pages instead of paying the handshake per request.
+
+    With requests-cache installed and cached=True, GET responses are
+    cached on disk and every request revalidates with a conditional GET
+    (ETag/Last-Modified), so unchanged pages come back as body-less 304s.
+    Flows that mutate the collections they read should pass cached=False
+    so they never act on a stale listing.
+    """
+    if cached and requests_cache is not None:
+        session = requests_cache.CachedSession(
+            os.path.expanduser("~/.planningcenter_toolkit/http_cache"),
+            backend="sqlite",
+            expire_after=3600,
+            cache_control=True,
+            always_revalidate=True,
+        )
+    else:
+        session = requests.Session()
+    session.auth = auth
+    # Brotli roughly halves bytes on the wire versus gzip for large pages
+    session.headers["Accept-Encoding"] = _ACCEPT_ENCODING
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def iter_people(session, limit):
     """
-    Fetch people data from the Planning Center API.
+    Fetch people data from the Planning Center API, yielding one output
+    row per person in the same column order as the people command's
+    headers. Streaming tuples keeps memory at one page rather than the
+    whole result set and feeds csv.writer.writerows directly.
     """
-    auth = HTTPBasicAuth(client_id, client_secret)
     params = {
         "include": "phone_numbers,emails,addresses,households",
-        "per_page": 100  # Fetch up to 100 people per page
+        # Only ask the server for as many people as we will actually use
+        "per_page": max(1, min(limit, 100)),
+        # Sparse fieldsets: only request the attributes we actually read,
+        # so bytes on the wire (and parse time) drop with them
+        "fields[people]": ",".join((
+            "first_name", "last_name", "nickname", "birthdate", "anniversary",
+            "gender", "marital_status", "child", "avatar", "status",
+            "inactivated_at", "inactive_reason", "membership", "created_at",
+            "updated_at", "graduation_year", "medical_notes", "school_type",
+            "login_identifier", "phone_numbers", "emails", "addresses",
+            "households"
+        )),
+        "fields[PhoneNumber]": "number",
+        "fields[Email]": "address",
+        "fields[Address]": "street,city,state,zip,location",
+        "fields[Household]": "member_count"
     }
 
-    people_list = []
+    yielded = 0
     next_page = "https://api.planningcenteronline.com/people/v2/people"
 
-    while next_page:
-        response = requests.get(next_page, auth=auth, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        # Process each person in the current page
-        for person in data["data"]:
-            if len(people_list) >= limit:
-                break  # Stop adding people once we've reached the limit
-
-            attributes = person["attributes"]
-            person_info = {
-                "id": person["id"],
-                "first_name": attributes.get("first_name"),
-                "last_name": attributes.get("last_name"),
-                "nickname": attributes.get("nickname"),
-                "birthday": attributes.get("birthdate"),
-                "anniversary": attributes.get("anniversary"),
-                "gender": attributes.get("gender"),
-                "marital_status": attributes.get("marital_status"),
-                "child": attributes.get("child"),
-                "avatar": attributes.get("avatar"),
-                "status": attributes.get("status"),
-                "inactivated_at": attributes.get("inactivated_at"),
-                "inactive_reason": attributes.get("inactive_reason"),
-                "membership": attributes.get("membership"),
-                "created_at": attributes.get("created_at"),
-                "updated_at": attributes.get("updated_at"),
-                "graduation_year": attributes.get("graduation_year"),
-                "medical_notes": attributes.get("medical_notes"),
-                "school_type": attributes.get("school_type"),
-                "login_identifier": attributes.get("login_identifier"),
-                # Household count (default to 0 if not found)
-                "household_count": 0,
-                # Address components
-                "home_street": None,
-                "home_city": None,
-                "home_state": None,
-                "home_zip": None,
-                "work_street": None,
-                "work_city": None,
-                "work_state": None,
-                "work_zip": None,
-                # Contact details
-                "phone_numbers": [],
-                "emails": []
-            }
-
-            included_data = {item["id"]: item for item in data.get("included", [])}
-            
-            for rel_type, rel_data in person.get("relationships", {}).items():
-                if rel_type == "phone_numbers":
-                    for phone_id in rel_data["data"]:
-                        phone = included_data.get(phone_id["id"])
-                        if phone:
-                            person_info["phone_numbers"].append(phone["attributes"]["number"])
-                
-                elif rel_type == "emails":
-                    for email_id in rel_data["data"]:
-                        email = included_data.get(email_id["id"])
-                        if email:
-                            person_info["emails"].append(email["attributes"]["address"])
-
-                elif rel_type == "addresses":
-                    for address_id in rel_data["data"]:
-                        address = included_data.get(address_id["id"])
-                        if address:
-                            address_type = address["attributes"]["location"]
-                            if address_type == "Home":
-                                person_info["home_street"] = address["attributes"].get("street")
-                                person_info["home_city"] = address["attributes"].get("city")
-                                person_info["home_state"] = address["attributes"].get("state")
-                                person_info["home_zip"] = address["attributes"].get("zip")
-                            elif address_type == "Work":
-                                person_info["work_street"] = address["attributes"].get("street")
-                                person_info["work_city"] = address["attributes"].get("city")
-                                person_info["work_state"] = address["attributes"].get("state")
-                                person_info["work_zip"] = address["attributes"].get("zip")
-
-                elif rel_type == "households":
-                    for household in rel_data["data"]:
-                        household_id = household["id"]
-                        household_data = included_data.get(household_id)
-                        if household_data and household_data["type"] == "Household":
-                            member_count = household_data["attributes"].get("member_count", 0)
-                            person_info["household_count"] += member_count
-
-            people_list.append(person_info)
-
-        # Stop fetching new pages if we've reached the limit
-        if len(people_list) >= limit:
-            break
-
-        next_page = data.get("links", {}).get("next")
-
-    return people_list
-
+    # One-deep prefetch: while the current page is being parsed and
+    # processed, the next page's request is already in flight on a worker
+    # thread, hiding the network round trip behind the CPU work.
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetcher.submit(session.get, next_page, params=params)
+
+        while pending is not None:
+            response = pending.result()
+            response.raise_for_status()
+            # Parse the raw bytes directly; orjson skips the UTF-8 decode that
+            # response.json() performs before stdlib json.loads.
+            data = _json_loads(response.content)
+
+            next_page = data.get("links", {}).get("next")
+            # Count the just-parsed page before deciding to prefetch, so a
+            # page that already satisfies the limit doesn't trigger a
+            # wasted fetch of the next one
+            if next_page and yielded + len(data["data"]) < limit:
+                pending = prefetcher.submit(session.get, next_page, params=params)
+            else:
+                pending = None
+
+            # Index the included records once per page, not once per person
+            included_data = {(item["type"], item["id"]): item for item in data.get("included", [])}
+
+            # Process each person in the current page; slicing trims the
+            # final page instead of a per-person limit check
+            for person in data["data"][:limit - yielded]:
+                yield build_row(person, included_data)
+                yielded += 1
+
+            # Stop fetching new pages if we've reached the limit
+            if yielded >= limit:
+                return
 
 
 @click.group()
@@ -173,9 +210,7 @@ def people(limit, config):
     try:
         # Load authentication credentials
         client_id, client_secret = load_authentication(config)
-
-        # Fetch people data with the specified limit
-        people = fetch_people(client_id, client_secret, limit)
+        session = _session(HTTPBasicAuth(client_id, client_secret))
 
         # Define headers for tabular output
         headers = [
@@ -212,43 +247,11 @@ def people(limit, config):
             "Emails"
         ]
 
-        # Print headers
-        print("\t".join(headers))
-
-        # Print each person's information in tab-delimited format
-        for person in people:
-            row = [
-                person["id"],
-                person["first_name"] or "",
-                person["last_name"] or "",
-                person["nickname"] or "",
-                person["birthday"] or "",
-                person["anniversary"] or "",
-                person["gender"] or "",
-                person["marital_status"] or "",
-                str(person["child"]) if person["child"] is not None else "",
-                person["avatar"] or "",
-                person["status"] or "",
-                person["inactivated_at"] or "",
-                person["inactive_reason"] or "",
-                person["membership"] or "",
-                person["created_at"] or "",
-                person["updated_at"] or "",
-                str(person['household_count']),
-                # Home Address components
-                person["home_street"] or "",
-                person["home_city"] or "",
-                person["home_state"] or "",
-                person["home_zip"] or "",
-                # Work Address components
-                person["work_street"] or "",
-                person["work_city"] or "",
-                person["work_state"] or "",
-                person["work_zip"] or "",
-                ", ".join(person["phone_numbers"]),
-                ", ".join(person["emails"])
-            ]
-            print("\t".join(row))
+        # Stream rows straight from the API to stdout; csv.writer batches
+        # the writes in C and nothing holds the full result set in memory
+        writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+        writer.writerow(headers)
+        writer.writerows(iter_people(session, limit))
 
     except FileNotFoundError as e:
         print(f"Error: {e}. Please ensure the configuration file exists at {config}.")
@@ -291,39 +294,59 @@ def init(config):
     create_default_config(config)
 
 
-def fetch_teams(client_id, client_secret, limit):
+def fetch_teams(session, limit):
    """
    Fetch all teams from the Planning Center API with an optional limit.
    """
-   auth = HTTPBasicAuth(client_id, client_secret)
    url = "https://api.planningcenteronline.com/services/v2/teams"  # Update this URL based on your needs
-   response = requests.get(url, auth=auth)
-   response.raise_for_status()
-   data = response.json()
-
-   # Limit the number of teams returned based on user input
-   return [{"id": team["id"], "name": team["attributes"]["name"], "positions": team["attributes"].get("positions", [])} for team in data["data"]][:limit]
-
-def fetch_people_in_team(client_id, client_secret, team_id):
+   params = {
+       "per_page": min(limit, 100),  # Only ask the server for what we need
+       "fields[Team]": "name,positions"
+   }
+
+   teams = []
+   while url and len(teams) < limit:
+       response = session.get(url, params=params)
+       response.raise_for_status()
+       data = _json_loads(response.content)
+
+       teams.extend(
+           {"id": team["id"], "name": team["attributes"]["name"], "positions": team["attributes"].get("positions", [])}
+           for team in data["data"]
+       )
+       url = data.get("links", {}).get("next")
+
+   return teams[:limit]
+
+def fetch_people_in_team(session, team_id):
    """
    Fetch all people associated with a specific team from the Planning Center API.
    """
-   auth = HTTPBasicAuth(client_id, client_secret)
    url = f"https://api.planningcenteronline.com/services/v2/teams/{team_id}/people"  # Update this URL based on your needs
-   response = requests.get(url, auth=auth)
-   response.raise_for_status()
-   data = response.json()
-
-   return [
-       {
-           "id": person["id"],
-           "first_name": person["attributes"].get("first_name"),
-           "last_name": person["attributes"].get("last_name"),
-           "emails": [email["address"] for email in person.get("emails", [])],
-           "phone_numbers": [phone["number"] for phone in person.get("phone_numbers", [])]
-       }
-       for person in data["data"]
-   ]
+   params = {
+       "per_page": 100,
+       "fields[Person]": "first_name,last_name"
+   }
+
+   people = []
+   while url:
+       response = session.get(url, params=params)
+       response.raise_for_status()
+       data = _json_loads(response.content)
+
+       people.extend(
+           {
+               "id": person["id"],
+               "first_name": person["attributes"].get("first_name"),
+               "last_name": person["attributes"].get("last_name"),
+               "emails": [email["address"] for email in person.get("emails", [])],
+               "phone_numbers": [phone["number"] for phone in person.get("phone_numbers", [])]
+           }
+           for person in data["data"]
+       )
+       url = data.get("links", {}).get("next")
+
+   return people
 
 
 @get.command()
@@ -343,19 +366,25 @@ def teams(limit, config):
     """
     try:
         client_id, client_secret = load_authentication(config)
-        
+        session = _session(HTTPBasicAuth(client_id, client_secret))
+
         # Fetch teams with limit
-        teams_list = fetch_teams(client_id, client_secret, limit)
+        teams_list = fetch_teams(session, limit)
 
-        # Print headers for teams
         team_headers = ["Team ID", "Team Name", "Positions", "Person ID", "First Name", "Last Name", "Emails", "Phone Numbers"]
-        print("\t".join(team_headers))
+        rows = ["\t".join(team_headers)]
+
+        # Fetch each team's people in parallel over the shared session;
+        # executor.map preserves input order, so rows still print per team.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            people_by_team = list(executor.map(
+                lambda team: fetch_people_in_team(session, team['id']),
+                teams_list
+            ))
 
-        for team in teams_list:
-            # Fetch people associated with each team
-            people_in_team = fetch_people_in_team(client_id, client_secret, team['id'])
+        for team, people_in_team in zip(teams_list, people_by_team):
             for person in people_in_team:
-                print("\t".join([
+                rows.append("\t".join([
                     str(team['id']),
                     team['name'],
                     ", ".join(team['positions']),
@@ -369,20 +398,24 @@ def teams(limit, config):
             # If you want to print team info even if there are no people,
             # you can add a check here to handle that case.
 
+        sys.stdout.write("\n".join(rows) + "\n")
+
     except Exception as e:
         print(f"Error fetching teams: {e}")
 
-def get_paginated_results(url, auth):
-    results = []
+def get_paginated_results(url, session):
+    """
+    Yield rows from a paginated endpoint one page at a time, so callers
+    never hold more than a single page in memory and can stop early.
+    """
     while url:
-        response = requests.get(url, auth=auth)
+        response = session.get(url)
         if response.status_code != 200:
             print(f"Error fetching data: Status code {response.status_code}")
             break
-        data = response.json()
-        results.extend(data["data"])
+        data = _json_loads(response.content)
+        yield from data["data"]
         url = data["links"].get("next")
-    return results
 
 @cli.group()
 def clear():
@@ -410,12 +443,17 @@ def team_position(config, service_type_name, team_position_name):
     # auth
     client_id, client_secret = load_authentication(config)
     base_url = "https://api.planningcenteronline.com/services/v2"
-    auth = HTTPBasicAuth(client_id, client_secret)
+    # This flow deletes from the listings it reads, so skip the HTTP cache
+    session = _session(HTTPBasicAuth(client_id, client_secret), cached=False)
 
-    # Step 1: Get the service type ID
+    # Step 1: Get the service type ID. Feeding the generator into next()
+    # stops paginating as soon as the name matches.
     service_types_url = f"{base_url}/service_types"
-    service_types = get_paginated_results(service_types_url, auth)
-    service_type_id = next((st["id"] for st in service_types if st["attributes"]["name"] == service_type_name), None)
+    service_type_id = next(
+        (st["id"] for st in get_paginated_results(service_types_url, session)
+         if st["attributes"]["name"] == service_type_name),
+        None
+    )
 
     if not service_type_id:
         print(f"Service type '{service_type_name}' not found.")
@@ -423,8 +461,11 @@ def team_position(config, service_type_name, team_position_name):
 
     # Step 2: Get the team position ID
     team_positions_url = f"{base_url}/service_types/{service_type_id}/team_positions"
-    team_positions = get_paginated_results(team_positions_url, auth)
-    team_position_id = next((tp["id"] for tp in team_positions if tp["attributes"]["name"] == team_position_name), None)
+    team_position_id = next(
+        (tp["id"] for tp in get_paginated_results(team_positions_url, session)
+         if tp["attributes"]["name"] == team_position_name),
+        None
+    )
 
     if not team_position_id:
         print(f"Team position '{team_position_name}' not found in service type '{service_type_name}'.")
@@ -432,18 +473,28 @@ def team_position(config, service_type_name, team_position_name):
 
     # Step 3: Get person team position assignments
     assignments_url = f"{base_url}/service_types/{service_type_id}/team_positions/{team_position_id}/person_team_position_assignments"
-    assignments = get_paginated_results(assignments_url, auth)
-
-    # Step 4: Remove each assignment
-    for assignment in assignments:
-        assignment_id = assignment["id"]
-        delete_url = f"{base_url}/service_types/{service_type_id}/team_positions/{team_position_id}/person_team_position_assignments/{assignment_id}"
-        delete_response = requests.delete(delete_url, auth=auth)
-
-        if delete_response.status_code == 204:
-            print(f"Successfully removed assignment {assignment_id} from {team_position_name} in {service_type_name}")
-        else:
-            print(f"Failed to remove assignment {assignment_id}. Status code: {delete_response.status_code}")
+    # Materialize the full listing before deleting anything: the DELETEs
+    # shift the collection's offsets, so paginating lazily while they run
+    # would skip assignments that are still present
+    assignments = list(get_paginated_results(assignments_url, session))
+
+    # Step 4: Remove each assignment. The deletes are independent, so fan
+    # them out over the pooled session instead of paying one round trip at
+    # a time. max_workers stays modest to respect PCO rate limits; the
+    # session's retry policy backs off on 429s.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(session.delete, f"{assignments_url}/{assignment['id']}"): assignment["id"]
+            for assignment in assignments
+        }
+        for future in as_completed(futures):
+            assignment_id = futures[future]
+            delete_response = future.result()
+
+            if delete_response.status_code == 204:
+                print(f"Successfully removed assignment {assignment_id} from {team_position_name} in {service_type_name}")
+            else:
+                print(f"Failed to remove assignment {assignment_id}. Status code: {delete_response.status_code}")
 
     print(f"All assignments have been removed from {team_position_name} in {service_type_name}.")
 
@@ -0,0 +1,11 @@
+from setuptools import setup
+
+# AOT-compile the per-person row builder with mypyc when it is available;
+# installs without mypy fall back to the pure-Python module.
+try:
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["planningcenter_toolkit/_row.py"])
+except ImportError:
+    ext_modules = []
+
+setup(ext_modules=ext_modules)